@@ -37,7 +37,16 @@ CREATE TABLE IF NOT EXISTS generation_logs (
   semester_label TEXT NOT NULL
 );
 
-INSERT OR IGNORE INTO semesters (id, label, order_index) VALUES
+CREATE TABLE IF NOT EXISTS schema_meta (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_subjects_name_lower ON subjects (lower(name));
+CREATE INDEX IF NOT EXISTS idx_streams_name_lower ON streams (lower(name));
+
+INSERT OR IGNORE INTO semesters (id, label, order_index)
+SELECT column1, column2, column3 FROM (VALUES
   (1, '1st', 1),
   (2, '2nd', 2),
   (3, '3rd', 3),
@@ -45,4 +54,7 @@ INSERT OR IGNORE INTO semesters (id, label, order_index) VALUES
   (5, '5th', 5),
   (6, '6th', 6),
   (7, '7th', 7),
-  (8, '8th', 8);
+  (8, '8th', 8))
+WHERE NOT EXISTS (SELECT 1 FROM schema_meta WHERE key = 'seed_version');
+
+INSERT OR IGNORE INTO schema_meta (key, value) VALUES ('seed_version', '1');
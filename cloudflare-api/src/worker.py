@@ -1,16 +1,24 @@
 import html
 import json
+import time
 from datetime import datetime, timezone
 from urllib.parse import parse_qs, urlparse
 
 from workers import Response, WorkerEntrypoint, fetch
 
 
+JSON_SEPARATORS = (",", ":")
+
+
+def encode_json(data):
+    return json.dumps(data, separators=JSON_SEPARATORS)
+
+
 def json_response(data, status=200, extra_headers=None):
     headers = {"Content-Type": "application/json"}
     if extra_headers:
         headers.update(extra_headers)
-    return Response(json.dumps(data), status=status, headers=headers)
+    return Response(encode_json(data), status=status, headers=headers)
 
 
 def allowed_origin(env):
@@ -26,8 +34,11 @@ def cors_headers(env):
 
 
 def with_cors(env, response):
-    merged_headers = {}
     existing_headers = getattr(response, "headers", None)
+    if isinstance(existing_headers, dict):
+        existing_headers.update(cors_headers(env))
+        return response
+    merged_headers = {}
     if existing_headers:
         if hasattr(existing_headers, "entries"):
             for key, value in existing_headers.entries():
@@ -103,6 +114,90 @@ def local_render_mode(env):
     return str(env_value(env, "LOCAL_RENDER_MODE", "") or "").strip().lower()
 
 
+FONT_FACE_CACHE = {}
+
+
+def font_face_css(env):
+    font_url = env_value(env, "PUBLIC_FONT_URL", "")
+    if not font_url:
+        return ""
+    cached = FONT_FACE_CACHE.get(font_url)
+    if cached is None:
+        cached = f"""
+        @font-face {{
+          font-family: "FrontpageSans";
+          src: url("{font_url}") format("truetype");
+        }}
+        """
+        FONT_FACE_CACHE[font_url] = cached
+    return cached
+
+
+PAGE_SHELL_CACHE = {}
+ROW_MARKUP_SLOT = "__ROW_MARKUP__"
+
+ROW_FRAGMENT_CACHE = {}
+ROW_VALUE_SLOT = "__ROW_VALUE__"
+
+ROW_FIELDS = (
+    ("Name", "name"),
+    ("Roll No.", "roll"),
+    ("Registration No.", "reg"),
+    ("Stream", "stream_label"),
+    ("Semester", "semester_label"),
+    ("Paper Code", "subject_code"),
+    ("Paper Name", "subject_name"),
+)
+
+
+def row_fragment(label, value_class=""):
+    key = (label, value_class)
+    cached = ROW_FRAGMENT_CACHE.get(key)
+    if cached is None:
+        fragment = f"""
+        <div class="info-row">
+          <div class="label-cell">{label}</div>
+          <div class="value-cell{value_class}">{ROW_VALUE_SLOT}</div>
+        </div>
+        """
+        cached = tuple(fragment.split(ROW_VALUE_SLOT, 1))
+        ROW_FRAGMENT_CACHE[key] = cached
+    return cached
+
+
+TABLE_SEGMENT_CACHE = {}
+
+
+def table_segments(paper_name_class):
+    cached = TABLE_SEGMENT_CACHE.get(paper_name_class)
+    if cached is not None:
+        return cached
+    statics = []
+    pending = ""
+    for index, (label, _) in enumerate(ROW_FIELDS):
+        value_class = paper_name_class if label == "Paper Name" else ""
+        fragment_prefix, fragment_suffix = row_fragment(label, value_class)
+        if index:
+            pending += "\n"
+        statics.append(pending + fragment_prefix)
+        pending = fragment_suffix
+    statics.append(pending)
+    cached = tuple(statics)
+    TABLE_SEGMENT_CACHE[paper_name_class] = cached
+    return cached
+
+
+def warm_row_fragments():
+    for label, _ in ROW_FIELDS:
+        if label != "Paper Name":
+            row_fragment(label)
+    table_segments(" value-cell--paper-name")
+    table_segments(" value-cell--paper-name value-cell--compact")
+
+
+warm_row_fragments()
+
+
 def row_to_dict(row):
     if row is None:
         return {}
@@ -130,12 +225,27 @@ async def response_bytes(response):
     raise TypeError("Unsupported response body reader")
 
 
+TRUTHY_VALUES = frozenset({"1", "true", "yes", "on"})
+
+GENERATION_FIELDS = (
+    "name",
+    "roll",
+    "reg",
+    "stream_label",
+    "semester_label",
+    "subject_name",
+    "subject_code",
+)
+
+FEEDBACK_FIELDS = ("name", "topic", "message")
+
+
 def normalized_bool(value, default=True):
     if value is None:
         return default
     if isinstance(value, bool):
         return value
-    return str(value).strip().lower() in {"1", "true", "yes", "on"}
+    return str(value).strip().lower() in TRUTHY_VALUES
 
 
 def request_header_value(request, name):
@@ -195,6 +305,8 @@ def normalize_feedback_text(value, limit):
 
 
 async def parse_json_payload(request):
+    if request_header_value(request, "Content-Length") == "0":
+        return None, json_response({"error": "Invalid JSON payload"}, status=400)
     try:
         payload = await request.json()
     except Exception:
@@ -237,13 +349,80 @@ async def send_feedback_to_discord(env, payload):
         webhook_url,
         method="POST",
         headers={"Content-Type": "application/json"},
-        body=json.dumps(discord_payload),
+        body=encode_json(discord_payload),
     )
     if not response.ok:
         details = await response.text()
         raise RuntimeError(details or "Discord webhook request failed.")
 
 
+STATS_CACHE = {"count": None, "expires_at": 0.0}
+STATS_CACHE_TTL_SECONDS = 30
+
+
+def cached_stats_count():
+    if STATS_CACHE["count"] is None or time.monotonic() >= STATS_CACHE["expires_at"]:
+        return None
+    return STATS_CACHE["count"]
+
+
+def store_stats_count(count):
+    STATS_CACHE["count"] = count
+    STATS_CACHE["expires_at"] = time.monotonic() + STATS_CACHE_TTL_SECONDS
+
+
+def invalidate_stats_cache():
+    STATS_CACHE["count"] = None
+    STATS_CACHE["expires_at"] = 0.0
+
+
+CATALOG_CACHE = {"data": None, "expires_at": 0.0}
+CATALOG_CACHE_TTL_SECONDS = 30
+
+
+def invalidate_catalog_cache():
+    CATALOG_CACHE["data"] = None
+    CATALOG_CACHE["expires_at"] = 0.0
+
+
+async def load_catalog(env):
+    cached = CATALOG_CACHE["data"]
+    if cached is not None and time.monotonic() < CATALOG_CACHE["expires_at"]:
+        return cached
+
+    statements = [
+        env.DB.prepare(
+            "SELECT id, label, order_index FROM semesters ORDER BY order_index"
+        ),
+        env.DB.prepare("SELECT id, name, short_code FROM streams ORDER BY name"),
+        env.DB.prepare("SELECT id, name, code FROM subjects ORDER BY name"),
+    ]
+    batch = getattr(env.DB, "batch", None)
+    if callable(batch):
+        semesters_result, streams_result, subjects_result = await batch(statements)
+    else:
+        semesters_result = await statements[0].all()
+        streams_result = await statements[1].all()
+        subjects_result = await statements[2].all()
+
+    data = {
+        "semesters": [row_to_dict(row) for row in (semesters_result.results or [])],
+        "streams": [row_to_dict(row) for row in (streams_result.results or [])],
+        "subjects": [row_to_dict(row) for row in (subjects_result.results or [])],
+    }
+    CATALOG_CACHE["data"] = data
+    CATALOG_CACHE["expires_at"] = time.monotonic() + CATALOG_CACHE_TTL_SECONDS
+    return data
+
+
+def schedule_background_task(ctx, coroutine):
+    wait_until = getattr(ctx, "waitUntil", None) or getattr(ctx, "wait_until", None)
+    if callable(wait_until):
+        wait_until(coroutine)
+        return True
+    return False
+
+
 async def log_generation(env, payload):
     created_at = datetime.now(timezone.utc).isoformat()
     await (
@@ -273,55 +452,32 @@ async def log_generation(env, payload):
         )
         .run()
     )
+    invalidate_stats_cache()
 
 
 def render_frontpage_html(payload, env):
-    font_url = env_value(env, "PUBLIC_FONT_URL", "")
+    shell_prefix, shell_suffix = page_shell(env)
 
-    font_face = ""
-    if font_url:
-        font_face = f"""
-        @font-face {{
-          font-family: "FrontpageSans";
-          src: url("{font_url}") format("truetype");
-        }}
-        """
-
-    subject_name = sanitize_text(payload["subject_name"])
-    subject_code = sanitize_text(payload["subject_code"])
-    rows = [
-        sanitize_text(payload["name"]),
-        sanitize_text(payload["roll"]),
-        sanitize_text(payload["reg"]),
-        sanitize_text(payload["stream_label"]),
-        sanitize_text(payload["semester_label"]),
-        subject_code,
-        subject_name,
-    ]
-
-    table_rows = [
-        ("Name", rows[0]),
-        ("Roll No.", rows[1]),
-        ("Registration No.", rows[2]),
-        ("Stream", rows[3]),
-        ("Semester", rows[4]),
-        ("Paper Code", rows[5]),
-        ("Paper Name", rows[6]),
-    ]
     paper_name_compact_class = (
         " value-cell--compact" if word_count(payload["subject_name"]) > 3 else ""
     )
-    row_markup = "\n".join(
-        f"""
-        <div class="info-row">
-          <div class="label-cell">{label}</div>
-          <div class="value-cell{" value-cell--paper-name" + paper_name_compact_class if label == "Paper Name" else ""}">{value}</div>
-        </div>
-        """
-        for label, value in table_rows
-    )
+    segments = table_segments(" value-cell--paper-name" + paper_name_compact_class)
+    row_parts = [segments[0]]
+    for index, (_, field) in enumerate(ROW_FIELDS):
+        row_parts.append(sanitize_text(payload[field]))
+        row_parts.append(segments[index + 1])
+    row_markup = "".join(row_parts)
+
+    return shell_prefix + row_markup + shell_suffix
+
 
-    return f"""
+def page_shell(env):
+    font_face = font_face_css(env)
+    shell = PAGE_SHELL_CACHE.get(font_face)
+    if shell is not None:
+        return shell
+
+    document = f"""
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -497,7 +653,7 @@ def render_frontpage_html(payload, env):
       <div class="report-title">Lab Report</div>
 
       <div class="table">
-        {row_markup}
+        {ROW_MARKUP_SLOT}
       </div>
 
       <div class="footer">
@@ -509,6 +665,10 @@ def render_frontpage_html(payload, env):
 </body>
 </html>
 """
+    prefix, suffix = document.split(ROW_MARKUP_SLOT, 1)
+    shell = (prefix, suffix)
+    PAGE_SHELL_CACHE[font_face] = shell
+    return shell
 
 
 class Default(WorkerEntrypoint):
@@ -525,49 +685,25 @@ class Default(WorkerEntrypoint):
             return with_cors(self.env, json_response({"ok": True}))
 
         if path == "/api/stats" and method == "GET":
-            row = await self.env.DB.prepare(
-                "SELECT COUNT(*) AS count FROM generation_logs"
-            ).first()
-            row_data = row_to_dict(row)
-            count = row_data.get("count", 0) or 0
+            count = cached_stats_count()
+            if count is None:
+                row = await self.env.DB.prepare(
+                    "SELECT COUNT(*) AS count FROM generation_logs"
+                ).first()
+                row_data = row_to_dict(row)
+                count = row_data.get("count", 0) or 0
+                store_stats_count(count)
             return with_cors(self.env, json_response({"generated_count": count}))
 
         if path == "/api/catalog" and method == "GET":
-            semesters_result = await self.env.DB.prepare(
-                "SELECT id, label, order_index FROM semesters ORDER BY order_index"
-            ).all()
-            streams_result = await self.env.DB.prepare(
-                "SELECT id, name, short_code FROM streams ORDER BY name"
-            ).all()
-            subjects_result = await self.env.DB.prepare(
-                "SELECT id, name, code FROM subjects ORDER BY name"
-            ).all()
-
-            semesters = [row_to_dict(row) for row in (semesters_result.results or [])]
-            streams = [row_to_dict(row) for row in (streams_result.results or [])]
-            subjects = [row_to_dict(row) for row in (subjects_result.results or [])]
-
-            return with_cors(
-                self.env,
-                json_response(
-                    {"semesters": semesters, "streams": streams, "subjects": subjects}
-                ),
-            )
+            catalog = await load_catalog(self.env)
+            return with_cors(self.env, json_response(catalog))
 
         if path == "/api/generate-pdf" and method == "POST":
             payload, parse_error = await parse_json_payload(request)
             if parse_error:
                 return with_cors(self.env, parse_error)
-            required_fields = [
-                "name",
-                "roll",
-                "reg",
-                "stream_label",
-                "semester_label",
-                "subject_name",
-                "subject_code",
-            ]
-            missing = require_fields(payload, required_fields)
+            missing = require_fields(payload, GENERATION_FIELDS)
             if missing:
                 return with_cors(
                     self.env,
@@ -608,6 +744,13 @@ class Default(WorkerEntrypoint):
                     )
 
                 wants_pdf = normalized_bool(payload.get("as_pdf"), default=True)
+                image_format = str(payload.get("image_format", "") or "").strip().lower()
+                if image_format not in {"png", "jpeg"}:
+                    image_format = (
+                        "jpeg"
+                        if normalized_bool(payload.get("as_jpeg"), default=False)
+                        else "png"
+                    )
                 endpoint = "pdf" if wants_pdf else "screenshot"
                 request_body = {"html": html_document}
                 if wants_pdf:
@@ -627,9 +770,11 @@ class Default(WorkerEntrypoint):
                         "deviceScaleFactor": 1,
                     }
                     request_body["screenshotOptions"] = {
-                        "type": "png",
+                        "type": image_format,
                         "fullPage": False,
                     }
+                    if image_format == "jpeg":
+                        request_body["screenshotOptions"]["quality"] = 90
 
                 browser_response = await fetch(
                     f"https://api.cloudflare.com/client/v4/accounts/{browser_account_id}/browser-rendering/{endpoint}",
@@ -638,7 +783,7 @@ class Default(WorkerEntrypoint):
                         "Authorization": f"Bearer {browser_token}",
                         "Content-Type": "application/json",
                     },
-                    body=json.dumps(request_body),
+                    body=encode_json(request_body),
                 )
 
                 if not browser_response.ok:
@@ -664,11 +809,20 @@ class Default(WorkerEntrypoint):
                         ),
                     )
 
-                await log_generation(self.env, payload)
+                log_task = log_generation(self.env, payload)
+                if not schedule_background_task(getattr(self, "ctx", None), log_task):
+                    await log_task
 
                 document_bytes = await response_bytes(browser_response)
-                download_ext = "pdf" if wants_pdf else "png"
-                content_type = "application/pdf" if wants_pdf else "image/png"
+                if wants_pdf:
+                    download_ext = "pdf"
+                    content_type = "application/pdf"
+                elif image_format == "jpeg":
+                    download_ext = "jpg"
+                    content_type = "image/jpeg"
+                else:
+                    download_ext = "png"
+                    content_type = "image/png"
                 safe_subject = str(payload["subject_name"]).strip().replace(" ", "-")
                 filename = f"{str(payload['name']).strip()}-{safe_subject}-FrontPageCover.{download_ext}"
                 response = Response(
@@ -695,16 +849,7 @@ class Default(WorkerEntrypoint):
             payload, parse_error = await parse_json_payload(request)
             if parse_error:
                 return with_cors(self.env, parse_error)
-            required_fields = [
-                "name",
-                "roll",
-                "reg",
-                "stream_label",
-                "semester_label",
-                "subject_name",
-                "subject_code",
-            ]
-            missing = require_fields(payload, required_fields)
+            missing = require_fields(payload, GENERATION_FIELDS)
             if missing:
                 return with_cors(
                     self.env,
@@ -736,8 +881,7 @@ class Default(WorkerEntrypoint):
             payload, parse_error = await parse_json_payload(request)
             if parse_error:
                 return with_cors(self.env, parse_error)
-            required_fields = ["name", "topic", "message"]
-            missing = require_fields(payload, required_fields)
+            missing = require_fields(payload, FEEDBACK_FIELDS)
             if missing:
                 return with_cors(
                     self.env,
@@ -791,32 +935,8 @@ class Default(WorkerEntrypoint):
                 return with_cors(self.env, json_response({"error": reason}, status=401))
 
             if method == "GET":
-                semesters_result = await self.env.DB.prepare(
-                    "SELECT id, label, order_index FROM semesters ORDER BY order_index"
-                ).all()
-                streams_result = await self.env.DB.prepare(
-                    "SELECT id, name, short_code FROM streams ORDER BY name"
-                ).all()
-                subjects_result = await self.env.DB.prepare(
-                    "SELECT id, name, code FROM subjects ORDER BY name"
-                ).all()
-
-                semesters = [
-                    row_to_dict(row) for row in (semesters_result.results or [])
-                ]
-                streams = [row_to_dict(row) for row in (streams_result.results or [])]
-                subjects = [row_to_dict(row) for row in (subjects_result.results or [])]
-
-                return with_cors(
-                    self.env,
-                    json_response(
-                        {
-                            "semesters": semesters,
-                            "streams": streams,
-                            "subjects": subjects,
-                        }
-                    ),
-                )
+                catalog = await load_catalog(self.env)
+                return with_cors(self.env, json_response(catalog))
 
             if method in {"POST", "PUT", "DELETE"}:
                 payload, parse_error = await parse_json_payload(request)
@@ -904,6 +1024,7 @@ class Default(WorkerEntrypoint):
                     )
                     offering_id = row_to_dict(offering_created).get("id")
 
+                invalidate_catalog_cache()
                 return with_cors(
                     self.env,
                     json_response(
@@ -939,8 +1060,14 @@ class Default(WorkerEntrypoint):
                 current_row = (
                     await self.env.DB.prepare(
                         """
-                    SELECT off.id AS offering_id, off.subject_id AS subject_id
+                    SELECT
+                      off.id AS offering_id,
+                      off.subject_id AS subject_id,
+                      off.semester_id AS semester_id,
+                      s.name AS name,
+                      s.code AS code
                     FROM subject_offerings off
+                    JOIN subjects s ON s.id = off.subject_id
                     WHERE off.id = ?
                     """
                     )
@@ -956,6 +1083,16 @@ class Default(WorkerEntrypoint):
                         ),
                     )
 
+                if (
+                    subject_name == str(current.get("name", "") or "")
+                    and code == str(current.get("code", "") or "")
+                    and semester_id == parse_int(current.get("semester_id"))
+                ):
+                    return with_cors(
+                        self.env,
+                        json_response({"message": "Subject updated"}),
+                    )
+
                 duplicate_row = (
                     await self.env.DB.prepare(
                         "SELECT id FROM subjects WHERE lower(name) = lower(?) AND id != ?"
@@ -973,20 +1110,20 @@ class Default(WorkerEntrypoint):
                     )
 
                 try:
-                    await (
+                    update_statements = [
                         self.env.DB.prepare(
                             "UPDATE subjects SET name = ?, code = ? WHERE id = ?"
-                        )
-                        .bind(subject_name, code, current["subject_id"])
-                        .run()
-                    )
-                    await (
+                        ).bind(subject_name, code, current["subject_id"]),
                         self.env.DB.prepare(
                             "UPDATE subject_offerings SET semester_id = ? WHERE id = ?"
-                        )
-                        .bind(semester_id, offering_id)
-                        .run()
-                    )
+                        ).bind(semester_id, offering_id),
+                    ]
+                    batch = getattr(self.env.DB, "batch", None)
+                    if callable(batch):
+                        await batch(update_statements)
+                    else:
+                        for statement in update_statements:
+                            await statement.run()
                 except Exception as error:
                     return with_cors(
                         self.env,
@@ -999,6 +1136,7 @@ class Default(WorkerEntrypoint):
                         ),
                     )
 
+                invalidate_catalog_cache()
                 return with_cors(
                     self.env,
                     json_response({"message": "Subject updated"}),
@@ -1028,28 +1166,28 @@ class Default(WorkerEntrypoint):
                         ),
                     )
 
-                await (
-                    self.env.DB.prepare("DELETE FROM subject_offerings WHERE id = ?")
-                    .bind(offering_id)
-                    .run()
-                )
-                left_row = (
-                    await self.env.DB.prepare(
-                        "SELECT COUNT(*) AS count FROM subject_offerings WHERE subject_id = ?"
-                    )
-                    .bind(offering["subject_id"])
-                    .first()
-                )
-                left_count = (
-                    parse_int(row_to_dict(left_row).get("count"), default=0) or 0
-                )
-                if left_count == 0:
-                    await (
-                        self.env.DB.prepare("DELETE FROM subjects WHERE id = ?")
-                        .bind(offering["subject_id"])
-                        .run()
-                    )
+                delete_statements = [
+                    self.env.DB.prepare(
+                        "DELETE FROM subject_offerings WHERE id = ?"
+                    ).bind(offering_id),
+                    self.env.DB.prepare(
+                        """
+                    DELETE FROM subjects
+                    WHERE id = ?
+                      AND NOT EXISTS (
+                        SELECT 1 FROM subject_offerings WHERE subject_id = ?
+                      )
+                    """
+                    ).bind(offering["subject_id"], offering["subject_id"]),
+                ]
+                batch = getattr(self.env.DB, "batch", None)
+                if callable(batch):
+                    await batch(delete_statements)
+                else:
+                    for statement in delete_statements:
+                        await statement.run()
 
+                invalidate_catalog_cache()
                 return with_cors(
                     self.env,
                     json_response({"message": "Subject removed"}),
@@ -1104,6 +1242,7 @@ class Default(WorkerEntrypoint):
                         ),
                     )
 
+                invalidate_catalog_cache()
                 created = (
                     await self.env.DB.prepare(
                         "SELECT id FROM streams WHERE lower(name) = lower(?)"
@@ -1134,6 +1273,7 @@ class Default(WorkerEntrypoint):
                     .bind(stream_id)
                     .run()
                 )
+                invalidate_catalog_cache()
                 return with_cors(
                     self.env,
                     json_response({"message": "Stream removed"}),
@@ -1166,7 +1306,7 @@ class Default(WorkerEntrypoint):
                   semester_label AS semester,
                   subject_code AS code
                 FROM generation_logs
-                ORDER BY created_at DESC
+                ORDER BY id DESC
                 LIMIT ?
                 """
                 )
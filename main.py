@@ -13,12 +13,26 @@ app = Flask(__name__, template_folder="templates", static_folder="static")
 PORT = int(os.getenv("PORT", 5000))
 WORKER_API_BASE = str(os.getenv("WORKER_API_BASE", "http://127.0.0.1:8787")).rstrip("/")
 PUBLIC_DIR = Path("public")
+PROXY_CHUNK_SIZE = 64 * 1024
 
 
 def public_file(*parts):
     return PUBLIC_DIR.joinpath(*parts)
 
 
+def resolve_index_page_path():
+    for candidate in (
+        Path("static/index_page.pdf"),
+        public_file("static", "index_page.pdf"),
+    ):
+        if candidate.exists():
+            return candidate
+    return None
+
+
+INDEX_PAGE_PATH = resolve_index_page_path()
+
+
 def worker_url(path):
     if not path.startswith("/"):
         path = f"/{path}"
@@ -44,20 +58,33 @@ def forward_to_worker(path):
         headers["X-Admin-Key"] = admin_key
 
     target = worker_url(path)
+    app.logger.debug("Forwarding %s %s to %s", method, path, target)
     upstream_request = Request(target, data=payload, headers=headers, method=method)
 
     try:
-        with urlopen(upstream_request, timeout=30) as upstream_response:
-            body = upstream_response.read()
-            status = upstream_response.getcode()
-            response = Response(body, status=status)
-            content_type = upstream_response.headers.get("Content-Type")
-            content_disposition = upstream_response.headers.get("Content-Disposition")
-            if content_type:
-                response.headers["Content-Type"] = content_type
-            if content_disposition:
-                response.headers["Content-Disposition"] = content_disposition
-            return response
+        upstream_response = urlopen(upstream_request, timeout=30)
+
+        def stream_upstream():
+            try:
+                while True:
+                    chunk = upstream_response.read(PROXY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                upstream_response.close()
+
+        response = Response(stream_upstream(), status=upstream_response.getcode())
+        content_type = upstream_response.headers.get("Content-Type")
+        content_length = upstream_response.headers.get("Content-Length")
+        content_disposition = upstream_response.headers.get("Content-Disposition")
+        if content_type:
+            response.headers["Content-Type"] = content_type
+        if content_length:
+            response.headers["Content-Length"] = content_length
+        if content_disposition:
+            response.headers["Content-Disposition"] = content_disposition
+        return response
     except HTTPError as error:
         body = error.read() if hasattr(error, "read") else b""
         response = Response(body, status=error.code)
@@ -67,6 +94,7 @@ def forward_to_worker(path):
                 response.headers["Content-Type"] = content_type
         return response
     except URLError as error:
+        app.logger.warning("Could not reach Worker API at %s: %s", target, error)
         return Response(
             f'{{"error":"Could not reach Worker API","details":"{error}"}}',
             status=502,
@@ -97,10 +125,8 @@ def admin_dashboard():
 
 @app.route("/downloads/index-page", methods=["GET"])
 def download_index_page():
-    index_path = Path("static/index_page.pdf")
-    if not index_path.exists():
-        index_path = public_file("static", "index_page.pdf")
-    if not index_path.exists():
+    index_path = INDEX_PAGE_PATH or resolve_index_page_path()
+    if index_path is None:
         return Response(
             '{"error":"Index page file is unavailable"}',
             status=404,
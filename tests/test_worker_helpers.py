@@ -1,3 +1,4 @@
+import asyncio
 import importlib.util
 import sys
 import types
@@ -58,6 +59,30 @@ class WorkerHelperTests(unittest.TestCase):
         self.assertEqual(worker.clamp_text("abcdef", 4), "abc…")
         self.assertEqual(worker.clamp_text("abc", 4), "abc")
 
+    def test_parse_json_payload_skips_parsing_empty_bodies(self):
+        class EmptyRequest:
+            headers = {"Content-Length": "0"}
+
+            async def json(self):
+                raise AssertionError("json() should not run for empty bodies")
+
+        payload, error = asyncio.run(worker.parse_json_payload(EmptyRequest()))
+        self.assertIsNone(payload)
+        self.assertEqual(error.status, 400)
+
+    def test_encode_json_is_compact(self):
+        self.assertEqual(
+            worker.encode_json({"a": 1, "b": [1, 2]}), '{"a":1,"b":[1,2]}'
+        )
+
+    def test_stats_cache_round_trip(self):
+        worker.invalidate_stats_cache()
+        self.assertIsNone(worker.cached_stats_count())
+        worker.store_stats_count(42)
+        self.assertEqual(worker.cached_stats_count(), 42)
+        worker.invalidate_stats_cache()
+        self.assertIsNone(worker.cached_stats_count())
+
     def test_normalized_bool(self):
         self.assertTrue(worker.normalized_bool(True))
         self.assertTrue(worker.normalized_bool("yes"))